@@ -7,52 +7,104 @@ Installation:
     pip install pyrekordbox
 """
 
+import re
 import json
 import argparse
 from pathlib import Path
 
 try:
     from pyrekordbox import Rekordbox6Database
-    from pyrekordbox.db6 import tables
 except ImportError:
-    print("Error: pyrekordbox not installed")
-    print("Install with: pip install pyrekordbox")
-    exit(1)
+    # Checked in main() so the matching helpers stay importable without it
+    Rekordbox6Database = None
+
+# DjmdPlaylist.Attribute values
+PLAYLIST = 0
+FOLDER = 1
+SMART_PLAYLIST = 4
+
+MIX_SUFFIX = re.compile(r'\((original|extended|radio|club)(mix|edit|version)\)$')
+
+def normalize_track(text):
+    """Lowercase and strip spaces so 'Artist - Title' strings compare loosely"""
+    return str(text).lower().replace(' ', '')
+
+def track_key(artist, title):
+    """Normalized 'Artist - Title' key shared by every library lookup"""
+    return normalize_track(f"{artist} - {title}")
+
+def track_metadata(content):
+    """(BPM, Key) of a library track; Rekordbox stores BPM multiplied by 100"""
+    bpm = content.BPM / 100 if content.BPM else None
+    return bpm, content.KeyName or ''
+
+def metadata_snapshot(entries):
+    """Index (track_key, (bpm, key)) pairs by exact and mix-suffix-insensitive key"""
+    snapshot = {'exact': {}, 'loose': {}}
+    for key, metadata in entries:
+        snapshot['exact'].setdefault(key, metadata)
+        snapshot['loose'].setdefault(loose_track_key(key), {}).setdefault(key, metadata)
+    return snapshot
+
+def load_library_snapshot(db):
+    """Snapshot the library's BPM/Key once, see metadata_snapshot"""
+    return metadata_snapshot((track_key(content.ArtistName, content.Title), track_metadata(content))
+                             for content in db.get_content())
+
+def lookup_metadata(snapshot, key):
+    """(BPM, Key) for a track_key, or None
+
+    Falls back to the key without a mix suffix when that points at a single
+    library track, the same rule match_tracks uses.
+    """
+    if key in snapshot['exact']:
+        return snapshot['exact'][key]
+
+    loose = snapshot['loose'].get(loose_track_key(key), {})
+    if len(loose) == 1:
+        return next(iter(loose.values()))
+    return None
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
 
 def list_playlists(db):
     """List all playlists in Rekordbox"""
-    playlists = db.get_playlist()
+    playlists = db.get_playlist().all()
 
     print("\nRekordbox Playlists:")
     print("=" * 80)
 
     for pl in playlists:
-        track_count = len(db.get_playlist_tracks(pl.ID)) if pl.ID else 0
-        print(f"ID: {pl.ID:4d} | {pl.Name:50s} | {track_count:4d} tracks")
+        print(f"ID: {pl.ID:>10s} | {pl.Name:50s} | {len(pl.Songs):4d} tracks")
 
     print("=" * 80)
     print(f"Total: {len(playlists)} playlists")
 
 def search_tracks(db, query):
     """Search for tracks in Rekordbox library"""
-    all_tracks = db.get_track()
     query_lower = query.lower()
 
     matches = []
-    for track in all_tracks:
+    for track in db.get_content():
         # Search in title, artist, album
         if (query_lower in str(track.Title).lower() or
-            query_lower in str(track.Artist).lower() or
-            query_lower in str(track.Album).lower()):
+            query_lower in str(track.ArtistName).lower() or
+            query_lower in str(track.AlbumName).lower()):
             matches.append(track)
 
     print(f"\nSearch Results for '{query}':")
     print("=" * 80)
 
     for track in matches:
-        print(f"{track.Artist} - {track.Title}")
-        print(f"  Album: {track.Album}")
-        print(f"  BPM: {track.Tempo:.1f}, Key: {track.Key}")
+        bpm, key = track_metadata(track)
+        print(f"{track.ArtistName} - {track.Title}")
+        print(f"  Album: {track.AlbumName}")
+        print(f"  BPM: {bpm or 0:.1f}, Key: {key}")
         print(f"  File: {track.FolderPath}")
         print()
 
@@ -63,52 +115,58 @@ def export_playlist_csv(db, playlist_name, output_file):
     """Export playlist to CSV format"""
     import csv
 
-    playlists = db.get_playlist()
-    target_playlist = None
+    target_playlist, error = find_playlist(db, playlist_name)
 
-    for pl in playlists:
-        if pl.Name == playlist_name:
-            target_playlist = pl
-            break
+    if error:
+        print(f"Error: {error}")
+        return
 
     if not target_playlist:
         print(f"Error: Playlist '{playlist_name}' not found")
         return
 
-    tracks = db.get_playlist_tracks(target_playlist.ID)
+    songs = sorted(target_playlist.Songs, key=lambda song: song.TrackNo or 0)
 
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow(['Artist', 'Title', 'Album', 'BPM', 'Key', 'Genre', 'File Path'])
 
-        for track_entry in tracks:
-            track = db.get_track(id=track_entry.TrackID)[0]
+        for song in songs:
+            track = song.Content
+            bpm, key = track_metadata(track)
             writer.writerow([
-                track.Artist,
+                track.ArtistName,
                 track.Title,
-                track.Album,
-                track.Tempo,
-                track.Key,
-                track.Genre,
+                track.AlbumName,
+                bpm or '',
+                key,
+                track.GenreName,
                 track.FolderPath
             ])
 
-    print(f"✓ Exported {len(tracks)} tracks to {output_file}")
-
-def create_shopping_list(tracklist_json, output_file):
-    """Create a shopping list from recognized tracks"""
-    with open(tracklist_json, 'r') as f:
-        results = json.load(f)
+    print(f"✓ Exported {len(songs)} tracks to {output_file}")
 
-    # Remove duplicates
+def unique_tracks(results):
+    """Recognition results with repeated 'Artist - Title' detections removed"""
     seen = set()
-    unique_tracks = []
+    tracks = []
 
     for item in results:
         track_id = f"{item['artist']} - {item['title']}"
         if track_id not in seen:
             seen.add(track_id)
-            unique_tracks.append(item)
+            tracks.append(item)
+
+    return tracks
+
+def load_set_tracks(tracklist_json):
+    """Unique recognized tracks from a results file, in set order"""
+    with open(tracklist_json, 'r') as f:
+        return unique_tracks(json.load(f))
+
+def create_shopping_list(tracklist_json, output_file):
+    """Create a shopping list from recognized tracks"""
+    tracks = load_set_tracks(tracklist_json)
 
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write("# DJ Set Track Shopping List\n")
@@ -120,7 +178,7 @@ def create_shopping_list(tracklist_json, output_file):
         f.write("- Juno Download: https://www.junodownload.com/\n\n")
         f.write("## Tracks:\n\n")
 
-        for i, track in enumerate(unique_tracks, 1):
+        for i, track in enumerate(tracks, 1):
             f.write(f"{i:2d}. [{track.get('timestamp', 0) // 60:02d}:{track.get('timestamp', 0) % 60:02d}] "
                    f"{track['artist']} - {track['title']}\n")
 
@@ -133,11 +191,11 @@ def create_shopping_list(tracklist_json, output_file):
             f.write("\n")
 
         f.write("=" * 80 + "\n")
-        f.write(f"\nTotal tracks to download: {len(unique_tracks)}\n")
-        f.write(f"Estimated cost (@ $2.00/track): ${len(unique_tracks) * 2:.2f}\n")
+        f.write(f"\nTotal tracks to download: {len(tracks)}\n")
+        f.write(f"Estimated cost (@ $2.00/track): ${len(tracks) * 2:.2f}\n")
 
     print(f"✓ Shopping list saved to {output_file}")
-    print(f"  {len(unique_tracks)} unique tracks")
+    print(f"  {len(tracks)} unique tracks")
 
 def find_missing_tracks(db, shopping_list):
     """Check which tracks from shopping list are already in Rekordbox"""
@@ -157,17 +215,17 @@ def find_missing_tracks(db, shopping_list):
                 needed_tracks.append(track_info)
 
     # Check against Rekordbox library
-    all_tracks = db.get_track()
+    all_tracks = [(f"{t.ArtistName} - {t.Title}", track_key(t.ArtistName, t.Title))
+                  for t in db.get_content()]
 
     found = []
     missing = []
 
     for needed in needed_tracks:
         found_match = False
-        for rb_track in all_tracks:
-            rb_full = f"{rb_track.Artist} - {rb_track.Title}"
+        for rb_full, rb_key in all_tracks:
             # Fuzzy matching
-            if needed.lower().replace(' ', '') in rb_full.lower().replace(' ', ''):
+            if normalize_track(needed) in rb_key:
                 found.append((needed, rb_full))
                 found_match = True
                 break
@@ -192,6 +250,228 @@ def find_missing_tracks(db, shopping_list):
     print(f"\n{'='*80}")
     print(f"Summary: {len(found)} found, {len(missing)} missing")
 
+def loose_track_key(key):
+    """track_key with a trailing '(Original Mix)'-style suffix removed"""
+    return MIX_SUFFIX.sub('', key)
+
+def build_library_index(db):
+    """Index the library once for exact, mix-suffix-insensitive and per-artist lookups"""
+    index = {'exact': {}, 'loose': {}, 'artist': {}}
+
+    for content in db.get_content():
+        key = track_key(content.ArtistName, content.Title)
+        index['exact'].setdefault(key, content)
+        index['loose'].setdefault(loose_track_key(key), []).append(content)
+        index['artist'].setdefault(normalize_track(content.ArtistName), []).append(content)
+
+    return index
+
+def match_tracks(index, tracks, max_candidates=3):
+    """Match recognized tracks against a library index
+
+    A track matches on its exact key, or on its key without a mix suffix
+    when that points at a single library track. Anything else is missing,
+    with same-artist titles containing the recognized title listed as
+    possible matches for the user to check; those are never written.
+    Returns (matched [(label, content)], missing [(label, [content])]).
+    """
+    matched = []
+    missing = []
+
+    for item in tracks:
+        label = f"{item['artist']} - {item['title']}"
+        key = track_key(item['artist'], item['title'])
+        content = index['exact'].get(key)
+
+        if content is None:
+            loose = index['loose'].get(loose_track_key(key), [])
+            if len({c.ID for c in loose}) == 1:
+                content = loose[0]
+
+        if content is not None:
+            matched.append((label, content))
+            continue
+
+        title = loose_track_key(normalize_track(item['title']))
+        candidates = [c for c in index['artist'].get(normalize_track(item['artist']), [])
+                      if title and title in normalize_track(c.Title)]
+        missing.append((label, candidates[:max_candidates]))
+
+    return matched, missing
+
+def find_playlist(db, name):
+    """Return (playlist, error) for the normal playlist called name
+
+    playlist is None when no node has that name. error is set when the name
+    belongs to a folder or smart playlist, or to several playlists.
+    """
+    nodes = db.get_playlist(Name=name).all()
+    playlists = [node for node in nodes if node.Attribute == PLAYLIST]
+
+    if len(playlists) > 1:
+        return None, f"'{name}' matches {len(playlists)} playlists"
+    if playlists:
+        return playlists[0], None
+    if any(node.Attribute == FOLDER for node in nodes):
+        return None, f"'{name}' is a folder"
+    if any(node.Attribute == SMART_PLAYLIST for node in nodes):
+        return None, f"'{name}' is a smart playlist"
+    if nodes:
+        return None, f"'{name}' is not a normal playlist"
+    return None, None
+
+def load_results_files(results_files):
+    """Load every results file up front as {results_file: tracks}
+
+    Missing, unreadable or malformed files are reported and left out.
+    Returns (loaded, bad) where bad lists the skipped files.
+    """
+    loaded = {}
+    bad = []
+
+    for results_file in results_files:
+        try:
+            loaded[results_file] = load_set_tracks(results_file)
+        except OSError as e:
+            print(f"✗ Skipping {results_file}: {e.strerror or e}")
+            bad.append(results_file)
+        except json.JSONDecodeError as e:
+            print(f"✗ Skipping {results_file}: not valid JSON ({e.msg})")
+            bad.append(results_file)
+        except (KeyError, TypeError):
+            print(f"✗ Skipping {results_file}: not a recognition results file")
+            bad.append(results_file)
+
+    return loaded, bad
+
+def build_playlists(db, results_files, playlist_name=None, batch_size=100):
+    """Create or update Rekordbox playlists from recognition results
+
+    One playlist per results file (named after the set), or a single
+    playlist when playlist_name is given. The library is indexed once and
+    changes are committed every batch_size tracks; on error the pending
+    batch is rolled back and earlier batches stay committed.
+    Returns True when every requested file and playlist was written.
+    """
+    loaded, bad = load_results_files(results_files)
+    if not loaded:
+        print("Error: No readable results files")
+        return False
+
+    # Same-named results files from different folders would silently merge
+    if not playlist_name:
+        names = {}
+        for results_file in loaded:
+            name = Path(results_file).stem.removesuffix('_results')
+            names.setdefault(name, []).append(results_file)
+
+        duplicates = {name: files for name, files in names.items() if len(files) > 1}
+        if duplicates:
+            print("Error: Several results files map to the same playlist name:")
+            for name, files in duplicates.items():
+                print(f"  {name}: {', '.join(str(f) for f in files)}")
+            print("Rename the files or merge them with --playlist NAME")
+            return False
+
+    print("Indexing Rekordbox library...")
+    index = build_library_index(db)
+    print(f"✓ Indexed {len(index['exact'])} tracks\n")
+
+    # Group needed tracks by target playlist, preserving set order
+    targets = {}
+    for results_file, tracks in loaded.items():
+        name = playlist_name or Path(results_file).stem.removesuffix('_results')
+        targets.setdefault(name, []).extend(tracks)
+    targets = {name: unique_tracks(tracks) for name, tracks in targets.items()}
+
+    # Resolve every playlist before writing anything
+    playlists = {}
+    skipped = 0
+    for name in list(targets):
+        playlist, error = find_playlist(db, name)
+        if error:
+            print(f"✗ Skipping {error}")
+            del targets[name]
+            skipped += 1
+        else:
+            playlists[name] = playlist
+
+    committed_tracks = committed_playlists = 0
+    pending_tracks = pending_playlists = 0
+    unmatched = {}
+    failed = False
+
+    try:
+        for name, tracks in targets.items():
+            matched, missing = match_tracks(index, tracks)
+            unmatched[name] = missing
+
+            playlist = playlists[name]
+            if playlist is None:
+                playlist = db.create_playlist(name)
+                pending_playlists += 1
+                print(f"+ Created playlist '{name}'")
+            else:
+                print(f"~ Updating playlist '{name}'")
+
+            existing = {song.ContentID for song in playlist.Songs}
+            new_tracks = 0
+
+            for label, content in matched:
+                if content.ID in existing:
+                    continue
+                db.add_to_playlist(playlist, content)
+                existing.add(content.ID)
+                new_tracks += 1
+                pending_tracks += 1
+
+                if pending_tracks >= batch_size:
+                    db.commit()
+                    committed_tracks += pending_tracks
+                    committed_playlists += pending_playlists
+                    pending_tracks = pending_playlists = 0
+
+            print(f"  {new_tracks} added, {len(matched) - new_tracks} already present, "
+                  f"{len(missing)} unmatched")
+
+        db.commit()
+        committed_tracks += pending_tracks
+        committed_playlists += pending_playlists
+        pending_tracks = pending_playlists = 0
+    except Exception as e:
+        db.rollback()
+        failed = True
+        print(f"\nError writing playlists: {e}")
+        print(f"Rolled back {pending_tracks} tracks and {pending_playlists} new playlists")
+        if committed_tracks or committed_playlists:
+            print(f"Already committed: {committed_tracks} tracks and {committed_playlists} "
+                  f"new playlists - these playlists are now partially written")
+        print("Make sure Rekordbox is closed before writing to the database")
+
+    print(f"\n{'='*80}")
+    print("Unmatched Tracks")
+    print(f"{'='*80}\n")
+
+    for name, missing in unmatched.items():
+        if missing:
+            print(f"{name}:")
+            for label, candidates in missing:
+                print(f"  ✗ {label}")
+                for content in candidates:
+                    print(f"    Possible match: {content.ArtistName} - {content.Title}")
+            print()
+
+    total_missing = sum(len(m) for m in unmatched.values())
+    print(f"{'='*80}")
+    status = "Stopped after error" if failed else "Summary"
+    print(f"{status}: {committed_tracks} tracks committed, {committed_playlists} playlists created, "
+          f"{total_missing} unmatched")
+
+    if bad or skipped:
+        print(f"Skipped: {len(bad)} results files, {skipped} playlists")
+
+    return not (failed or bad or skipped)
+
 def main():
     parser = argparse.ArgumentParser(
         description="Rekordbox Helper - CLI tool for Rekordbox operations",
@@ -212,6 +492,13 @@ Examples:
 
   # Check what you already have
   python rekordbox_helper.py --check-missing shopping.txt
+
+  # Create/update one playlist per recognized set (close Rekordbox first)
+  python rekordbox_helper.py --build-playlists sets/*_results.json
+
+  # Merge several sets into one playlist, against a copy of master.db
+  python rekordbox_helper.py --build-playlists a_results.json b_results.json \\
+      --playlist "Festival Prep" --db /tmp/master_copy.db
         """
     )
 
@@ -230,13 +517,25 @@ Examples:
     parser.add_argument('--check-missing', metavar='FILE',
                        help='Check which tracks from shopping list are missing')
 
+    parser.add_argument('--build-playlists', nargs='+', metavar='JSON',
+                       help='Create or update playlists from recognition results')
+
+    parser.add_argument('--playlist', metavar='NAME',
+                       help='Single playlist name for --build-playlists')
+
+    parser.add_argument('--batch-size', type=positive_int, default=100,
+                       help='Tracks per commit for --build-playlists (default: 100)')
+
+    parser.add_argument('--db', metavar='PATH',
+                       help='Path to a Rekordbox master.db (default: local library)')
+
     parser.add_argument('-o', '--output', metavar='FILE',
                        help='Output file path')
 
     args = parser.parse_args()
 
     if not any([args.list_playlists, args.search, args.export_playlist,
-                args.shopping_list, args.check_missing]):
+                args.shopping_list, args.check_missing, args.build_playlists]):
         parser.print_help()
         return
 
@@ -246,10 +545,15 @@ Examples:
         create_shopping_list(args.shopping_list, output)
         return
 
+    if Rekordbox6Database is None:
+        print("Error: pyrekordbox not installed")
+        print("Install with: pip install pyrekordbox")
+        exit(1)
+
     # Initialize Rekordbox database connection
     try:
         print("Connecting to Rekordbox database...")
-        db = Rekordbox6Database()
+        db = Rekordbox6Database(path=args.db) if args.db else Rekordbox6Database()
         print("✓ Connected successfully\n")
     except Exception as e:
         print(f"Error connecting to Rekordbox: {e}")
@@ -275,5 +579,9 @@ Examples:
     if args.check_missing:
         find_missing_tracks(db, args.check_missing)
 
+    if args.build_playlists:
+        if not build_playlists(db, args.build_playlists, args.playlist, args.batch_size):
+            exit(1)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Set Analytics - Similarity and transition analytics over recognized DJ sets
+Builds a track-transition graph and per-set feature vectors from all
+*_results.json files produced by recognize_dj_set.py
+
+Installation:
+    pip install numpy scipy
+    pip install pyrekordbox  # Optional, for BPM/Key from Rekordbox
+"""
+
+import csv
+import json
+import argparse
+from collections import Counter
+from pathlib import Path
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    print("Error: numpy/scipy not installed")
+    print("Install with: pip install numpy scipy")
+    exit(1)
+
+from rekordbox_helper import (Rekordbox6Database, normalize_track, track_key,
+                              metadata_snapshot, load_library_snapshot, lookup_metadata,
+                              positive_int)
+
+def load_tracklist(results_file):
+    """Load a results file as an ordered list of (key, artist, title)
+
+    Consecutive scans of the same song collapse into one entry, the same way
+    the tracklist in recognize_dj_set.py is built.
+    """
+    with open(results_file, 'r') as f:
+        results = json.load(f)
+
+    tracklist = []
+    last_key = None
+
+    for result in results:
+        key = track_key(result['artist'], result['title'])
+        if key != last_key:
+            tracklist.append((key, result['artist'], result['title']))
+            last_key = key
+
+    return tracklist
+
+def find_results_files(paths):
+    """Expand files and directories into a sorted list of *_results.json files"""
+    files = set()
+
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files.update(path.rglob('*_results.json'))
+        elif path.exists():
+            files.add(path)
+        else:
+            print(f"Warning: {path} not found, skipping")
+
+    return sorted(files)
+
+def set_name(results_file):
+    """Set name of a results file: its path without the _results.json suffix"""
+    path = Path(results_file)
+    return str(path.with_name(path.stem.removesuffix('_results')))
+
+class SetAnalytics:
+    """Sparse track-transition graph and set feature matrix
+
+    transitions[i, j] counts how often track j directly followed track i.
+    features[s, i] is the TF-IDF weight of track i in set s, with every row
+    L2-normalized so a sparse dot product gives cosine similarity.
+    """
+
+    def __init__(self, results_files):
+        self.set_names = []
+        self.track_index = {}
+        self.track_labels = []
+
+        rows, cols = [], []
+        src, dst = [], []
+
+        # Sets are named by file stem, falling back to the path when two
+        # folders hold results files with the same name
+        stems = Counter(Path(set_name(f)).name for f in results_files)
+        duplicates = sorted(stem for stem, count in stems.items() if count > 1)
+        if duplicates:
+            print(f"Warning: duplicate set names, using paths for: {', '.join(duplicates)}")
+
+        for set_id, results_file in enumerate(results_files):
+            name = set_name(results_file)
+            stem = Path(name).name
+            self.set_names.append(name if stem in duplicates else stem)
+            previous = None
+
+            for key, artist, title in load_tracklist(results_file):
+                if key not in self.track_index:
+                    self.track_index[key] = len(self.track_labels)
+                    self.track_labels.append(f"{artist} - {title}")
+                track_id = self.track_index[key]
+
+                rows.append(set_id)
+                cols.append(track_id)
+
+                if previous is not None and previous != track_id:
+                    src.append(previous)
+                    dst.append(track_id)
+                previous = track_id
+
+        n_sets = len(self.set_names)
+        n_tracks = len(self.track_labels)
+
+        # Duplicate (row, col) pairs are summed when converting to CSR
+        self.transitions = sparse.coo_matrix(
+            (np.ones(len(src), dtype=np.float32), (src, dst)),
+            shape=(n_tracks, n_tracks)
+        ).tocsr()
+
+        counts = sparse.coo_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(n_sets, n_tracks)
+        ).tocsr()
+        counts.data[:] = 1.0
+
+        # Down-weight anthems that show up in every set
+        document_freq = np.bincount(counts.indices, minlength=n_tracks)
+        idf = np.log((1 + n_sets) / (1 + document_freq)) + 1.0
+        features = counts.multiply(idf.reshape(1, -1)).tocsr()
+
+        norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self.features = sparse.diags(1.0 / norms).dot(features).tocsr()
+
+        self.metadata = {}
+
+    def find_tracks(self, query):
+        """Return the indexes of tracks matching an 'Artist - Title' query"""
+        key = normalize_track(query)
+        if key in self.track_index:
+            return [self.track_index[key]]
+
+        return [index for candidate, index in self.track_index.items()
+                if key in candidate]
+
+    def find_sets(self, name):
+        """Return the indexes of sets matching a name, path or results file"""
+        name = set_name(name)
+        if name in self.set_names:
+            return [self.set_names.index(name)]
+
+        stem = Path(name).name
+        return [i for i, candidate in enumerate(self.set_names)
+                if Path(candidate).name == stem]
+
+    def similar_sets(self, set_id, top_n=10):
+        """Return [(set_id, cosine similarity)] of the sets closest to set_id"""
+        scores = self.features.dot(self.features[set_id].T).toarray().ravel()
+        scores[set_id] = -1.0
+        return _top_n(scores, top_n)
+
+    def next_tracks(self, track_id, top_n=10):
+        """Return [(track_id, count)] of tracks most often played after track_id"""
+        row = self.transitions.getrow(track_id)
+        if row.nnz == 0:
+            return []
+
+        order = np.argsort(-row.data, kind='stable')[:top_n]
+        return [(int(row.indices[i]), int(row.data[i])) for i in order]
+
+    def set_bpm(self, set_id):
+        """Mean BPM of the tracks in a set that have Rekordbox metadata"""
+        start, end = self.features.indptr[set_id], self.features.indptr[set_id + 1]
+        bpms = [self.metadata[i][0] for i in self.features.indices[start:end]
+                if i in self.metadata and self.metadata[i][0]]
+        return sum(bpms) / len(bpms) if bpms else None
+
+    def join_metadata(self, snapshot):
+        """Attach (BPM, Key) from a rekordbox_helper metadata snapshot"""
+        for key, index in self.track_index.items():
+            metadata = lookup_metadata(snapshot, key)
+            if metadata is not None:
+                self.metadata[index] = metadata
+        return len(self.metadata)
+
+    def describe_track(self, track_id):
+        """Track label with BPM/Key when known"""
+        label = self.track_labels[track_id]
+        if track_id in self.metadata:
+            bpm, key = self.metadata[track_id]
+            details = [f"{bpm:.1f} BPM"] if bpm else []
+            details += [key] if key else []
+            if details:
+                label += f" ({', '.join(details)})"
+        return label
+
+def _top_n(scores, top_n):
+    """Indices and values of the top_n largest positive scores, best first"""
+    if top_n < len(scores):
+        candidates = np.argpartition(-scores, top_n)[:top_n]
+    else:
+        candidates = np.arange(len(scores))
+
+    candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+    return [(int(i), float(scores[i])) for i in candidates if scores[i] > 0]
+
+def load_rekordbox_csv(csv_file):
+    """Metadata snapshot from rekordbox_helper.py --export-playlist"""
+    with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+        return metadata_snapshot(
+            (track_key(row['Artist'], row['Title']),
+             (float(row['BPM']) if row.get('BPM') else None, row.get('Key', '')))
+            for row in csv.DictReader(f)
+        )
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Set Analytics - Similarity and transition analytics for recognized DJ sets",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Summarize every *_results.json in a folder
+  python set_analytics.py sets/
+
+  # Sets most similar to one set
+  python set_analytics.py sets/ --similar dj_set_abc123
+
+  # Most common next track after a track
+  python set_analytics.py sets/ --next "Rex the Dog - Prototype"
+
+  # Join BPM/Key from the Rekordbox library (or an exported playlist CSV)
+  python set_analytics.py sets/ --next "Prototype" --rekordbox
+  python set_analytics.py sets/ --next "Prototype" --rekordbox --db /tmp/master_copy.db
+  python set_analytics.py sets/ --next "Prototype" --rekordbox-csv playlist.csv
+        """
+    )
+
+    parser.add_argument('paths', nargs='+', metavar='PATH',
+                       help='Results JSON files or directories to scan')
+
+    parser.add_argument('--similar', metavar='SET',
+                       help='Show sets most similar to this set')
+
+    parser.add_argument('--next', metavar='TRACK',
+                       help='Show tracks most often played after this track')
+
+    parser.add_argument('-n', '--top', type=positive_int, default=10,
+                       help='Number of results to show (default: 10)')
+
+    source = parser.add_mutually_exclusive_group()
+
+    source.add_argument('--rekordbox', action='store_true',
+                       help='Join BPM/Key from the Rekordbox database')
+
+    source.add_argument('--rekordbox-csv', metavar='CSV',
+                       help='Join BPM/Key from a playlist CSV export')
+
+    parser.add_argument('--db', metavar='PATH',
+                       help='Path to a Rekordbox master.db for --rekordbox (default: local library)')
+
+    args = parser.parse_args()
+
+    if args.db and not args.rekordbox:
+        parser.error("--db requires --rekordbox")
+
+    results_files = find_results_files(args.paths)
+    if not results_files:
+        print("Error: No *_results.json files found")
+        return
+
+    analytics = SetAnalytics(results_files)
+
+    print(f"\n{'='*80}")
+    print("Set Analytics")
+    print(f"{'='*80}\n")
+    print(f"Sets: {len(analytics.set_names)}")
+    print(f"Unique tracks: {len(analytics.track_labels)}")
+    print(f"Distinct transitions: {analytics.transitions.nnz}")
+
+    if args.rekordbox:
+        if Rekordbox6Database is None:
+            print("Error: pyrekordbox not installed")
+            print("Install with: pip install pyrekordbox")
+            return
+        try:
+            db = Rekordbox6Database(path=args.db) if args.db else Rekordbox6Database()
+            library = load_library_snapshot(db)
+        except Exception as e:
+            print(f"Error loading Rekordbox library: {e}")
+            return
+        print(f"Matched in Rekordbox: {analytics.join_metadata(library)}")
+    elif args.rekordbox_csv:
+        library = load_rekordbox_csv(args.rekordbox_csv)
+        print(f"Matched in {args.rekordbox_csv}: {analytics.join_metadata(library)}")
+
+    if args.similar:
+        matches = analytics.find_sets(args.similar)
+        if not matches:
+            print(f"\nError: Set '{args.similar}' not found")
+            return
+        if len(matches) > 1:
+            print(f"\nError: Set '{args.similar}' is ambiguous, use one of:")
+            for other in matches:
+                print(f"  {analytics.set_names[other]}")
+            return
+        set_id = matches[0]
+
+        print(f"\nSets most similar to {analytics.set_names[set_id]}:")
+        print("-" * 80)
+        for other, score in analytics.similar_sets(set_id, args.top):
+            line = f"  {score:.3f}  {analytics.set_names[other]}"
+            bpm = analytics.set_bpm(other)
+            if bpm:
+                line += f" (avg {bpm:.1f} BPM)"
+            print(line)
+
+    if args.next:
+        matches = analytics.find_tracks(args.next)
+        if not matches:
+            print(f"\nError: Track '{args.next}' not found")
+            return
+        if len(matches) > 1:
+            print(f"\nError: Track '{args.next}' is ambiguous, use one of:")
+            for other in matches:
+                print(f"  {analytics.track_labels[other]}")
+            return
+        track_id = matches[0]
+
+        print(f"\nMost common next tracks after {analytics.describe_track(track_id)}:")
+        print("-" * 80)
+        for other, count in analytics.next_tracks(track_id, args.top):
+            print(f"  {count:3d}x  {analytics.describe_track(other)}")
+
+    print(f"\n{'='*80}")
+
+if __name__ == "__main__":
+    main()